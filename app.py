@@ -4,10 +4,23 @@ True Health Age - Interactive Web Questionnaire
 Streamlit app for calculating biological age
 """
 
+import csv
+import hashlib
+import heapq
+import io
+import itertools
+from dataclasses import replace
+from pathlib import Path
+
 import streamlit as st
-from tha_engine import THAEngine, load_config
-import pandas as pd
-import plotly.graph_objects as go
+from tha_engine import GENDERS, THAEngine, load_engine
+from questionnaire import SECTIONS, QUESTIONS_BY_KEY, QUESTION_KEYS, MULTISELECT_KEYS, WHAT_IF_KEYS
+import numpy as np
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 # Page config
 st.set_page_config(
@@ -17,54 +30,69 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Load BOTH engines (population and optimal calibration)
+# Load BOTH engines (population and optimal calibration); load_engine uses the
+# pickles from scripts/precompile_engine.py when fresh, else parses the YAML
 @st.cache_resource
 def load_engines():
-    config_pop = load_config("config.yaml")
-    config_opt = load_config("config_optimal.yaml")
-    engine_pop = THAEngine(config_pop)
-    engine_opt = THAEngine(config_opt)
+    engine_pop = load_engine("config.yaml")
+    engine_opt = load_engine("config_optimal.yaml")
+    # collect_answers packs multi-select masks once with engine_pop for both engines
+    multi_options = [{it["id"]: it["multi_options"] for it in e.items if "multi_options" in it}
+                     for e in (engine_pop, engine_opt)]
+    if multi_options[0] != multi_options[1]:
+        raise ValueError("config.yaml and config_optimal.yaml must list the same multi_options in the same order")
     return engine_pop, engine_opt
 
 engine_pop, engine_opt = load_engines()
 
-# Custom CSS
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 3rem;
-        font-weight: bold;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .sub-header {
-        font-size: 1.2rem;
-        text-align: center;
-        color: #666;
-        margin-bottom: 2rem;
-    }
-    .result-box {
-        padding: 2rem;
-        border-radius: 10px;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        text-align: center;
-        margin: 2rem 0;
-    }
-    .result-number {
-        font-size: 4rem;
-        font-weight: bold;
-        margin: 1rem 0;
-    }
-    .domain-card {
-        padding: 1rem;
-        border-radius: 8px;
-        background: #f8f9fa;
-        margin: 0.5rem 0;
-    }
-</style>
-""", unsafe_allow_html=True)
+def collect_answers():
+    """Build the engine answers dict from the questionnaire widget state."""
+    answers = {name: st.session_state[f"q_{name}"] for name in QUESTION_KEYS}
+    # multi-selects become int bitmasks and gender an int code: small, hashable cache keys
+    # (load_engines checks both engines share the same multi_options, so either one can pack the masks)
+    for name in MULTISELECT_KEYS:
+        answers[name] = engine_pop.option_mask(name, answers[name])
+    answers['waist_circumference'] = (answers['waist_circumference'], GENDERS.index(st.session_state.q_gender))
+    return answers
+
+def answers_digest(answers):
+    """Order-independent 64-bit digest of the answers dict (xxhash when installed, else blake2b)."""
+    data = repr(sorted(answers.items())).encode()
+    if xxhash is not None:
+        return xxhash.xxh64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+# Memoize engine calls so reruns with unchanged answers skip the full evaluation.
+# The answers are keyed by their precomputed digest; Streamlit does not hash "_" arguments.
+@st.cache_data(max_entries=128, hash_funcs={THAEngine: id})
+def compute_cached(engine, chron_age, digest, _answers):
+    return engine.compute(chron_age, _answers)
+
+@st.cache_data(max_entries=128, hash_funcs={THAEngine: id})
+def gains_cached(engine, digest, _answers):
+    return engine.one_step_gains_months(_answers)
+
+def score_scenarios(engine, chron_age, answers, options):
+    """
+    Score every on/off combination of the option groups in one compute_batch call.
+    Returns (combos, tha): combos is a (2**k, k) bool matrix in itertools.product order
+    (row 0 = no changes, last row = all changes), tha the THA per row.
+    """
+    base_vec = engine.encode_answers(answers)
+    combos = np.array(list(itertools.product((False, True), repeat=len(options))), dtype=bool)
+    scenarios = np.repeat(base_vec[None, :], len(combos), axis=0)
+    for j, changes in enumerate(options.values()):
+        vec = engine.encode_answers({**answers, **changes})
+        scenarios = np.where(combos[:, [j]] & (vec != base_vec), vec, scenarios)
+    return combos, engine.compute_batch(chron_age, scenarios).THA
+
+# Custom CSS: colors live in .streamlit/config.toml; the stylesheet is read once
+# per process and re-emitted as a plain <style> tag (no markdown parsing)
+@st.cache_resource
+def load_css():
+    return Path("assets/style.css").read_text(encoding="utf-8")
+
+st.html(f"<style>{load_css()}</style>")
 
 # Header
 st.markdown('<div class="main-header">🧬 True Health Age Calculator</div>', unsafe_allow_html=True)
@@ -106,575 +134,301 @@ with st.sidebar:
 # Initialize session state
 if 'answers' not in st.session_state:
     st.session_state.answers = {}
+    st.session_state.answers_digest = answers_digest({})
 if 'show_results' not in st.session_state:
     st.session_state.show_results = False
 
-# Main content
-tab1, tab2, tab3 = st.tabs(["📝 Questionnaire", "📊 Results", "🔍 What-If Analysis"])
-
-with tab1:
-    st.header("Complete Your Health Assessment")
-
-    # Chronological Age (default to 28 for optimal health demo)
-    chron_age = st.number_input(
-        "What is your chronological age?",
-        min_value=18,
-        max_value=100,
-        value=28,
-        help="Your actual age in years"
-    )
+def render_question(q, key_prefix="q_"):
+    """Render one QSpec with the matching Streamlit widget; value is kept under key_prefix + q.key."""
+    key = key_prefix + q.key
+    if q.kind == "number":
+        return st.number_input(q.label, min_value=q.min_value, max_value=q.max_value,
+                               value=q.default, help=q.help, key=key)
+    if q.kind == "slider":
+        return st.slider(q.label, min_value=q.min_value, max_value=q.max_value,
+                         value=q.default, step=q.step, help=q.help, key=key)
+    if q.kind == "select_slider":
+        return st.select_slider(q.label, options=q.options, value=q.default,
+                                format_func=q.labels.__getitem__, help=q.help, key=key)
+    if q.kind == "radio":
+        return st.radio(q.label, q.options, index=q.options.index(q.default),
+                        format_func=q.labels.__getitem__, help=q.help, key=key)
+    if q.kind == "selectbox":
+        return st.selectbox(q.label, q.options, index=q.options.index(q.default), help=q.help, key=key)
+    if q.kind == "multiselect":
+        return st.multiselect(q.label, q.options, default=list(q.default), help=q.help, key=key)
+    if q.kind == "text_area":
+        return st.text_area(q.label, placeholder=q.placeholder, help=q.help, key=key)
+    raise ValueError(f"Unknown question kind '{q.kind}' for {q.key}")
+
+def questionnaire_section(section):
+    with st.expander(section.title, expanded=section.expanded):
+        if len(section.columns) == 1:
+            for q in section.columns[0]:
+                render_question(q)
+            return
+        for col, questions in zip(st.columns(len(section.columns)), section.columns):
+            with col:
+                for q in questions:
+                    render_question(q)
+
+# Built once per distinct set of domain contributions; reruns reuse the cached data.
+# Bars are split into two series so each sign gets its own color.
+@st.cache_data(max_entries=32)
+def domain_chart_data(domain_items):
+    domain_items = sorted(domain_items, key=lambda kv: kv[1])
+    return {
+        'Domain': [d for d, _ in domain_items],
+        'Adds years': [max(y, 0.0) for _, y in domain_items],
+        'Removes years': [min(y, 0.0) for _, y in domain_items],
+    }
 
+def result_card(col, calibration, result, baseline):
+    """THA as a metric card; age acceleration is the delta (inverse: older is red)."""
+    with col.container(border=True):
+        st.subheader("True Health Age")
+        st.metric(calibration, f"{result.THA:.1f}", delta=f"{result.AgeAccel:+.1f} years",
+                  delta_color="inverse", help="Delta = age acceleration")
+        st.caption(baseline)
+
+# Partial sort (same order as sorted(..., reverse=True)[:k]), cached per distinct input
+@st.cache_data(max_entries=64)
+def top_k(items, k, by_magnitude=False):
+    key = (lambda kv: abs(kv[1])) if by_magnitude else (lambda kv: kv[1])
+    return heapq.nlargest(k, items, key=key)
+
+@st.fragment
+def render_results(chron_age):
+    # Calculate with BOTH engines using YOUR ACTUAL ANSWERS
+    answers, digest = st.session_state.answers, st.session_state.answers_digest
+    result_pop = compute_cached(engine_pop, float(chron_age), digest, answers)
+    result_opt = compute_cached(engine_opt, float(chron_age), digest, answers)
+
+    # Dual Score Display - SAME FORMAT FOR BOTH
+    col1, col2 = st.columns(2)
+    result_card(col1, "Population-Calibrated", result_pop, f"vs. average {chron_age}-year-old")
+    result_card(col2, "Optimal-Calibrated", result_opt, "vs. perfect health baseline")
+
+    # Interpretation based on both scores
     st.divider()
 
-    # Body & Energy Section
-    with st.expander("🏃 Body & Energy (11 questions)", expanded=True):
-        col1, col2 = st.columns(2)
-
-        with col1:
-            # OPTIMAL DEFAULTS for 25-30 year old
-            st.session_state.answers['height'] = st.number_input(
-                "Height (inches)",
-                min_value=48,
-                max_value=84,
-                value=70,  # 5'10"
-                help="Your height in inches (1 inch = 2.54 cm)"
-            )
-
-            st.session_state.answers['weight'] = st.number_input(
-                "Weight (pounds)",
-                min_value=80,
-                max_value=400,
-                value=160,  # BMI ~23 (optimal)
-                help="Your weight in pounds (1 lb = 0.45 kg)"
-            )
-
-            waist = st.number_input(
-                "Waist circumference (inches)",
-                min_value=20,
-                max_value=60,
-                value=32,  # Optimal range for male
-                help="Measure at belly button level"
-            )
-
-            gender = st.selectbox(
-                "Gender (for waist calculation)",
-                ["male", "female"],
-                index=0
-            )
-            st.session_state.answers['waist_circumference'] = (waist, gender)
-
-            st.session_state.answers['pregnancy_breastfeeding'] = st.multiselect(
-                "Are you pregnant or breastfeeding?",
-                ["Pregnant", "Breastfeeding", "Neither", "Prefer not to say"],
-                default=["Neither"]
-            )
-
-            st.session_state.answers['sleep_hours'] = st.slider(
-                "Hours of sleep per night",
-                min_value=3.0,
-                max_value=12.0,
-                value=8.0,  # Optimal sleep
-                step=0.5
-            )
-
-        with col2:
-            # OPTIMAL DEFAULTS (best bin = index 4)
-            st.session_state.answers['stress_frequency_30d'] = st.select_slider(
-                "Stress frequency (past 30 days)",
-                options=[0, 1, 2, 3, 4],
-                value=4,  # Almost never (BEST)
-                format_func=lambda x: ["Very often", "Often", "Sometimes", "Rarely", "Almost never"][x]
-            )
-
-            st.session_state.answers['energy_pattern'] = st.select_slider(
-                "Daytime energy pattern",
-                options=[0, 1, 2, 3, 4],
-                value=4,  # Steady (BEST)
-                format_func=lambda x: ["Very low crashes", "Low most day", "Up and down", "Steady w/dips", "Steady"][x]
-            )
-
-            st.session_state.answers['rested_feeling'] = st.select_slider(
-                "Feel rested after sleep?",
-                options=[0, 1, 2, 3, 4],
-                value=4,  # Fully refreshed (BEST)
-                format_func=lambda x: ["Never rested", "Rarely rested", "Sometimes rested", "Mostly rested", "Fully refreshed"][x]
-            )
-
-            st.session_state.answers['screen_time_before_bed'] = st.select_slider(
-                "Screen time 2h before bed",
-                options=[0, 1, 2, 3, 4],
-                value=4,  # None (BEST)
-                format_func=lambda x: ["2+ hours", "1-2 hours", "30-60 min", "15-30 min", "None"][x]
-            )
-
-            st.session_state.answers['recent_illness'] = st.radio(
-                "Illness in past 2 weeks?",
-                [0, 1, 2],
-                index=2,  # No (BEST)
-                format_func=lambda x: ["Yes, severe", "Yes, moderate", "No"][x]
-            )
-
-    # Movement & Metabolism
-    with st.expander("💪 Movement & Metabolism (4 questions)", expanded=False):
-        col1, col2 = st.columns(2)
-
-        with col1:
-            # OPTIMAL DEFAULTS
-            st.session_state.answers['daytime_activity'] = st.select_slider(
-                "Daytime activity pattern",
-                options=[0, 1, 2, 3, 4, 5],
-                value=4,  # Active job (BEST)
-                format_func=lambda x: ["Mostly sitting", "Mostly standing", "Light movement", "Regular walking", "Active job", "Very active"][x]
-            )
-
-            st.session_state.answers['strength_days_week'] = st.slider(
-                "Strength training days/week",
-                min_value=0,
-                max_value=7,
-                value=5  # 5 days/week (optimal)
-            )
-
-        with col2:
-            st.session_state.answers['cardio_days_week'] = st.slider(
-                "Cardio days/week",
-                min_value=0,
-                max_value=7,
-                value=6  # 6 days/week (optimal)
-            )
-
-            st.session_state.answers['eating_window_hours'] = st.slider(
-                "Daily eating window (hours)",
-                min_value=6,
-                max_value=18,
-                value=10,  # 10 hours (time-restricted feeding)
-                help="Time between first and last meal"
-            )
-
-    # Diet & Gut Health (simplified - showing key questions)
-    with st.expander("🥗 Diet & Gut Health (13 questions)", expanded=False):
-        col1, col2 = st.columns(2)
-
-        with col1:
-            # OPTIMAL DEFAULTS (rightmost = best)
-            st.session_state.answers['seed_oils_freq'] = st.select_slider(
-                "Seed oil consumption",
-                options=[0, 1, 2],
-                value=2,  # Rarely/Never (BEST)
-                format_func=lambda x: ["Regularly", "Sometimes", "Rarely/Never"][x]
-            )
-
-            st.session_state.answers['home_cooking_fat'] = st.select_slider(
-                "Primary cooking fat",
-                options=[0, 1, 2, 3, 4],
-                value=2,
-                format_func=lambda x: ["Vegetable oil", "Canola oil", "Olive oil", "Coconut oil", "Animal fat"][x]
-            )
-
-            st.session_state.answers['fried_foods_week'] = st.select_slider(
-                "Fried foods frequency",
-                options=[0, 1, 2, 3],
-                value=2,
-                format_func=lambda x: ["Several times/week", "2-3 times/week", "Once/week", "Never"][x]
-            )
-
-            st.session_state.answers['fruit_servings_day'] = st.select_slider(
-                "Fruit servings/day",
-                options=[0, 1, 2, 3],
-                value=1,
-                format_func=lambda x: ["<1", "1", "2", "3+"][x]
-            )
-
-            st.session_state.answers['veg_servings_day'] = st.select_slider(
-                "Vegetable servings/day",
-                options=[0, 1, 2, 3, 4],
-                value=2,
-                format_func=lambda x: ["1 or less", "2-3", "4-5", "6+", "6+"][x]
-            )
-
-            st.session_state.answers['packaged_foods_week'] = st.select_slider(
-                "Packaged/processed foods",
-                options=[0, 1, 2, 3],
-                value=2,
-                format_func=lambda x: ["Daily", "Often", "Sometimes", "Rarely"][x]
-            )
-
-            st.session_state.answers['reading_labels'] = st.select_slider(
-                "Read ingredient labels?",
-                options=[0, 1, 2],
-                value=1,
-                format_func=lambda x: ["Never", "Sometimes", "Always"][x]
-            )
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("📊 Population Interpretation")
+        if result_pop.AgeAccel < -2:
+            interpretation = "🌟 Exceptional! You're aging slower than average."
+        elif result_pop.AgeAccel < 2:
+            interpretation = "✅ Good! You're aging at close to average rate."
+        elif result_pop.AgeAccel < 5:
+            interpretation = "⚠️ Slightly accelerated aging. Room for improvement."
+        elif result_pop.AgeAccel < 8:
+            interpretation = "⚠️ Accelerated aging. Lifestyle changes recommended."
+        else:
+            interpretation = "🚨 Highly accelerated aging. Consult healthcare provider."
+        st.info(interpretation)
 
-        with col2:
-            st.session_state.answers['artificial_sweeteners_week'] = st.select_slider(
-                "Artificial sweeteners/week",
-                options=[0, 1, 2, 3, 4, 5],
-                value=2,
-                format_func=lambda x: ["5-6", "3-4", "1-2", "Occasionally", "Not sure", "None"][x]
-            )
-
-            st.session_state.answers['restaurant_meals_week'] = st.select_slider(
-                "Restaurant meals/week",
-                options=[0, 1, 2, 3, 4],
-                value=2,
-                format_func=lambda x: ["5+", "3-4", "1-2", "None", "Not sure"][x]
-            )
-
-            st.session_state.answers['fiber_foods_freq'] = st.select_slider(
-                "Fiber-rich foods frequency",
-                options=[0, 1, 2, 3, 4],
-                value=2,
-                format_func=lambda x: ["Rarely", "Few times/week", "Once/day", "Twice/day", "Multiple/day"][x]
-            )
-
-            st.session_state.answers['bowel_movements_day'] = st.slider(
-                "Bowel movements/day",
-                min_value=0,
-                max_value=6,
-                value=1
-            )
-
-            st.session_state.answers['digestive_issues_30d'] = st.select_slider(
-                "Digestive issues (past 30 days)",
-                options=[0, 1, 2, 3],
-                value=2,
-                format_func=lambda x: ["10+", "6-9", "2-5", "0-1"][x]
-            )
-
-            st.session_state.answers['antibiotics_12mo'] = st.radio(
-                "Antibiotics (past 12 months)",
-                [0, 1, 2, 3],
-                index=3,
-                format_func=lambda x: ["2+ courses", "1 course", "Not sure", "No"][x]
-            )
-
-    # Environment & Exposure
-    with st.expander("🌍 Environment & Exposure (9 questions)", expanded=False):
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.session_state.answers['nicotine_past_30_days'] = st.radio(
-                "Nicotine use (past 30 days)",
-                [0, 1, 2, 3],
-                index=3,
-                format_func=lambda x: ["Yes, daily", "Yes, few times/week", "Yes, occasionally", "No, not at all"][x]
-            )
-
-            st.session_state.answers['nicotine_history'] = st.radio(
-                "Nicotine use (history)",
-                [0, 1, 2, 3],
-                index=3,
-                format_func=lambda x: ["Still use daily", "Quit <12mo", "Quit >1yr", "Never used"][x]
-            )
-
-            st.session_state.answers['alcohol_days_30'] = st.select_slider(
-                "Alcohol days (past 30)",
-                options=[0, 1, 2, 3, 4, 5],
-                value=3,
-                format_func=lambda x: ["20-30", "10-19", "3-9", "1-2", "0", "Prefer not to say"][x]
-            )
-
-            st.session_state.answers['alcohol_drinks_per_day'] = st.select_slider(
-                "Drinks per drinking day",
-                options=[0, 1, 2, 3, 4, 5],
-                value=4,
-                format_func=lambda x: ["3+", "2", "1 or less", "None", "Not sure", "Prefer not to say"][x]
-            )
-
-            st.session_state.answers['sunlight_minutes_day'] = st.select_slider(
-                "Sunlight exposure/day",
-                options=[0, 1, 2, 3, 4],
-                value=2,
-                format_func=lambda x: ["<15min", "15-30min", "30-60min", "60+min", "60+min"][x]
-            )
+    with col2:
+        st.subheader("🎯 Optimal Standard")
+        if result_opt.AgeAccel < 0:
+            opt_interpretation = "🌟 Outstanding! You're younger than perfect health baseline."
+        elif result_opt.AgeAccel < 2:
+            opt_interpretation = "✅ Excellent! Very close to optimal health standard."
+        elif result_opt.AgeAccel < 5:
+            opt_interpretation = "👍 Good! Some room for optimization."
+        elif result_opt.AgeAccel < 8:
+            opt_interpretation = "⚠️ Fair. Significant room for improvement."
+        else:
+            opt_interpretation = "🚨 Needs work. Focus on key lifestyle changes."
+        st.info(opt_interpretation)
 
-        with col2:
-            st.session_state.answers['plastic_exposure'] = st.select_slider(
-                "Plastic container/bottle use",
-                options=[0, 1, 2, 3, 4],
-                value=2,
-                format_func=lambda x: ["Daily", "4-6/week", "1-3/week", "Rarely", "Not sure"][x]
-            )
-
-            st.session_state.answers['wifi_router_night'] = st.radio(
-                "Wi-Fi router on at night?",
-                [0, 1, 2, 3],
-                index=1,
-                format_func=lambda x: ["Every night in bedroom", "Every night elsewhere", "Some nights", "Turn it off"][x]
-            )
-
-            st.session_state.answers['phone_bedroom'] = st.radio(
-                "Phone in bedroom at night?",
-                [0, 1, 2, 3],
-                index=2,
-                format_func=lambda x: ["On all night", "Nearby but off", "Airplane mode", "Outside bedroom"][x]
-            )
-
-            st.session_state.answers['wireless_earbuds'] = st.radio(
-                "Wireless earbud use",
-                [0, 1, 2, 3],
-                index=2,
-                format_func=lambda x: ["3+ hours/day", "1-3 hours/day", "<1 hour/day", "Don't use"][x]
-            )
-
-    # Health History
-    with st.expander("🏥 Health History (2 questions)", expanded=False):
-        st.session_state.answers['family_history'] = st.multiselect(
-            "Family health history (select all that apply)",
-            ["Thyroid disease", "Type 2 diabetes", "Autoimmune disease",
-             "Heart disease", "High cholesterol", "Obesity", "Cancer", "None", "Not sure"],
-            default=["None"]
-        )
+    st.divider()
 
-        st.session_state.answers['personal_conditions'] = st.multiselect(
-            "Personal health conditions (select all that apply)",
-            ["High blood pressure", "High cholesterol", "Thyroid disorder",
-             "Autoimmune disease", "Digestive disorder", "Mental health condition",
-             "Chronic pain", "None", "Other"],
-            default=["None"]
+    # Domain contributions (from population calibration)
+    st.header("📊 Domain Breakdown (Population)")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Domain bar chart
+        st.subheader("Domain Contributions (years)")
+        st.bar_chart(
+            domain_chart_data(tuple(result_pop.domainYears.items())),
+            x='Domain',
+            y=['Adds years', 'Removes years'],
+            x_label="",
+            y_label="Years",
+            color=['#ff6b6b', '#51cf66'],
+            horizontal=True,
+            sort=False,
+            height=400
         )
 
-    # Supplements
-    with st.expander("💊 Supplements (1 question)", expanded=False):
-        st.session_state.answers['supplements_use'] = st.radio(
-            "Take supplements regularly?",
-            [0, 1, 2, 3],
-            index=1,
-            format_func=lambda x: ["No", "Sometimes", "Regularly (most days)", "Yes, daily"][x]
-        )
+    with col2:
+        # Top contributors
+        st.subheader("🎯 Top Contributors")
+        top_items = top_k(tuple(result_pop.itemYears.items()), 8, by_magnitude=True)
 
-    # Additional Notes
-    with st.expander("📝 Additional Notes (optional)", expanded=False):
-        st.session_state.answers['additional_notes'] = st.text_area(
-            "Any additional health information?",
-            placeholder="Enter any additional notes here (optional)...",
-            help="This field does not affect scoring"
-        )
+        for i, (item_id, years) in enumerate(top_items, 1):
+            if years != 0:
+                emoji = "❌" if years > 0.5 else "⚠️" if years > 0 else "✅"
+                st.markdown(f"{i}. {emoji} **{item_id.replace('_', ' ').title()}**: {years:+.2f} years")
 
     st.divider()
 
-    # Calculate button
-    col1, col2, col3 = st.columns([1, 1, 1])
-    with col2:
-        if st.button("🧬 Calculate My True Health Age", use_container_width=True, type="primary"):
-            st.session_state.show_results = True
-            st.rerun()
+    # Improvement opportunities (show from optimal perspective)
+    st.header("💡 Improvement Opportunities (Optimal Standard)")
+    gains = gains_cached(engine_opt, digest, answers)
+    top_gains = top_k(tuple(gains.items()), 5)
 
-with tab2:
-    if st.session_state.show_results:
-        # Calculate with BOTH engines using YOUR ACTUAL ANSWERS
-        result_pop = engine_pop.compute(float(chron_age), st.session_state.answers)
-        result_opt = engine_opt.compute(float(chron_age), st.session_state.answers)
-
-        # Dual Score Display - SAME FORMAT FOR BOTH
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.markdown(f"""
-            <div class="result-box">
-                <h3>True Health Age</h3>
-                <p style="font-size: 0.9rem; opacity: 0.9;">Population-Calibrated</p>
-                <div class="result-number">{result_pop.THA:.1f}</div>
-                <p style="font-size: 1.3rem;">Age Acceleration: {result_pop.AgeAccel:+.1f} years</p>
-                <p style="font-size: 1rem; margin-top: 1rem; opacity: 0.9;">
-                    vs. average {chron_age}-year-old
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
+    if any(g[1] > 0 for g in top_gains):
+        st.write("**Top 5 single-step improvements:**")
+        for i, (item_id, months) in enumerate(top_gains, 1):
+            if months > 0:
+                st.markdown(f"{i}. **{item_id.replace('_', ' ').title()}**: Potential gain of **{months:.1f} months**")
+    else:
+        st.success("🎉 You're already optimized in most areas!")
 
-        with col2:
-            st.markdown(f"""
-            <div class="result-box" style="background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);">
-                <h3>True Health Age</h3>
-                <p style="font-size: 0.9rem; opacity: 0.9;">Optimal-Calibrated</p>
-                <div class="result-number">{result_opt.THA:.1f}</div>
-                <p style="font-size: 1.3rem;">Age Acceleration: {result_opt.AgeAccel:+.1f} years</p>
-                <p style="font-size: 1rem; margin-top: 1rem; opacity: 0.9;">
-                    vs. perfect health baseline
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-
-        # Interpretation based on both scores
-        st.divider()
+    # Download results
+    st.divider()
+    results_data = {
+        'Chronological Age': chron_age,
+        'THA (Population)': result_pop.THA,
+        'Age Acceleration (Population)': result_pop.AgeAccel,
+        'THA (Optimal)': result_opt.THA,
+        'Age Acceleration (Optimal)': result_opt.AgeAccel,
+        **{f'Domain_{k}_Pop': v for k, v in result_pop.domainYears.items()},
+        **{f'Domain_{k}_Opt': v for k, v in result_opt.domainYears.items()}
+    }
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(results_data), lineterminator="\n")
+    writer.writeheader()
+    writer.writerow(results_data)
+    csv_text = buf.getvalue()
+
+    st.download_button(
+        label="📥 Download Results (CSV)",
+        data=csv_text,
+        file_name=f"tha_results_{chron_age}yo.csv",
+        mime="text/csv"
+    )
 
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.subheader("📊 Population Interpretation")
-            if result_pop.AgeAccel < -2:
-                interpretation = "🌟 Exceptional! You're aging slower than average."
-            elif result_pop.AgeAccel < 2:
-                interpretation = "✅ Good! You're aging at close to average rate."
-            elif result_pop.AgeAccel < 5:
-                interpretation = "⚠️ Slightly accelerated aging. Room for improvement."
-            elif result_pop.AgeAccel < 8:
-                interpretation = "⚠️ Accelerated aging. Lifestyle changes recommended."
+@st.fragment
+def render_what_if(chron_age):
+    # own fragment: ticking a change or moving its widget reruns only this tab
+    st.header("🔍 What-If Analysis")
+    st.write("See how specific lifestyle changes would affect your True Health Age")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Proposed Changes")
+
+        # each ticked question is one change, rendered with its questionnaire widget
+        # (starting from the current answer); every combination is scored
+        options = {}
+        for name in WHAT_IF_KEYS:
+            q = QUESTIONS_BY_KEY[name]
+            if st.checkbox(f"Change: {q.label}", key=f"wi_on_{name}"):
+                q = replace(q, default=st.session_state[f"q_{name}"])
+                options[q.label] = {name: render_question(q, key_prefix="wi_")}
+
+        if st.button("Calculate Impact", width="stretch"):
+            if options:
+                combos, tha = score_scenarios(engine_pop, float(chron_age), collect_answers(), options)
+                old_tha, new_tha = float(tha[0]), float(tha[-1])  # no changes / all changes
+                best = int(np.argmin(tha))
+
+                with col2:
+                    st.subheader("Projected Results")
+
+                    improvement = old_tha - new_tha
+
+                    st.metric(
+                        label="Current THA",
+                        value=f"{old_tha:.1f} years"
+                    )
+
+                    st.metric(
+                        label="New THA",
+                        value=f"{new_tha:.1f} years",
+                        delta=f"{-improvement:.1f} years"
+                    )
+
+                    if improvement > 0:
+                        st.success(f"🎉 You could reduce your biological age by **{improvement:.1f} years**!")
+                    elif improvement < 0:
+                        st.warning(f"⚠️ These changes would increase age by {-improvement:.1f} years")
+                    else:
+                        st.info("No significant change")
+
+                    if len(options) > 1 and tha[best] < tha[-1]:  # on a tie New THA already is the best
+                        picked = [name for name, on in zip(options, combos[best]) if on] or ["no changes"]
+                        st.info(f"Best combination: **{', '.join(picked)}** → THA {tha[best]:.1f}")
+
+                if len(options) > 1:
+                    import plotly.graph_objects as go
+
+                    fig = go.Figure(go.Parcoords(
+                        line=dict(color=tha, colorscale='RdYlGn', reversescale=True, showscale=True),
+                        dimensions=[
+                            *[dict(label=name, values=combos[:, j].astype(int), tickvals=[0, 1], ticktext=["No", "Yes"])
+                              for j, name in enumerate(options)],
+                            dict(label="THA", values=tha),
+                        ]
+                    ))
+                    fig.update_layout(title=f"All {len(tha)} scenarios", height=400)
+                    st.plotly_chart(fig, width="stretch")
             else:
-                interpretation = "🚨 Highly accelerated aging. Consult healthcare provider."
-            st.info(interpretation)
+                with col2:
+                    st.warning("Select at least one change to analyze")
 
-        with col2:
-            st.subheader("🎯 Optimal Standard")
-            if result_opt.AgeAccel < 0:
-                opt_interpretation = "🌟 Outstanding! You're younger than perfect health baseline."
-            elif result_opt.AgeAccel < 2:
-                opt_interpretation = "✅ Excellent! Very close to optimal health standard."
-            elif result_opt.AgeAccel < 5:
-                opt_interpretation = "👍 Good! Some room for optimization."
-            elif result_opt.AgeAccel < 8:
-                opt_interpretation = "⚠️ Fair. Significant room for improvement."
-            else:
-                opt_interpretation = "🚨 Needs work. Focus on key lifestyle changes."
-            st.info(opt_interpretation)
+# Main content
+tab1, tab2, tab3 = st.tabs(["📝 Questionnaire", "📊 Results", "🔍 What-If Analysis"])
 
-        st.divider()
+with tab1:
+    st.header("Complete Your Health Assessment")
 
-        # Domain contributions (from population calibration)
-        st.header("📊 Domain Breakdown (Population)")
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            # Domain bar chart
-            domain_df = pd.DataFrame({
-                'Domain': list(result_pop.domainYears.keys()),
-                'Years': list(result_pop.domainYears.values())
-            })
-            domain_df = domain_df.sort_values('Years', ascending=True)
-
-            fig = go.Figure(go.Bar(
-                x=domain_df['Years'],
-                y=domain_df['Domain'],
-                orientation='h',
-                marker_color=['#ff6b6b' if x > 0 else '#51cf66' for x in domain_df['Years']],
-                text=[f'{x:+.2f}' for x in domain_df['Years']],
-                textposition='outside'
-            ))
-            fig.update_layout(
-                title="Domain Contributions (years)",
-                xaxis_title="Years",
-                yaxis_title="",
-                height=400,
-                showlegend=False
-            )
-            st.plotly_chart(fig, use_container_width=True)
+    # The whole questionnaire is one form: widget edits stay in the browser and
+    # only the Calculate button sends them (one rerun instead of one per change)
+    with st.form("tha_form", border=False):
+        # Chronological Age (default to 28 for optimal health demo)
+        chron_age = st.number_input(
+            "What is your chronological age?",
+            min_value=18,
+            max_value=100,
+            value=28,
+            help="Your actual age in years"
+        )
 
-        with col2:
-            # Top contributors
-            st.subheader("🎯 Top Contributors")
-            sorted_items = sorted(result_pop.itemYears.items(), key=lambda x: abs(x[1]), reverse=True)
+        st.divider()
 
-            for i, (item_id, years) in enumerate(sorted_items[:8], 1):
-                if years != 0:
-                    emoji = "❌" if years > 0.5 else "⚠️" if years > 0 else "✅"
-                    st.markdown(f"{i}. {emoji} **{item_id.replace('_', ' ').title()}**: {years:+.2f} years")
+        for section in SECTIONS:
+            questionnaire_section(section)
 
         st.divider()
 
-        # Improvement opportunities (show from optimal perspective)
-        st.header("💡 Improvement Opportunities (Optimal Standard)")
-        gains = engine_opt.one_step_gains_months(st.session_state.answers)
-        top_gains = sorted(gains.items(), key=lambda x: x[1], reverse=True)[:5]
+        # Calculate button
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col2:
+            submitted = st.form_submit_button("🧬 Calculate My True Health Age", width="stretch", type="primary")
 
-        if any(g[1] > 0 for g in top_gains):
-            st.write("**Top 5 single-step improvements:**")
-            for i, (item_id, months) in enumerate(top_gains, 1):
-                if months > 0:
-                    st.markdown(f"{i}. **{item_id.replace('_', ' ').title()}**: Potential gain of **{months:.1f} months**")
-        else:
-            st.success("🎉 You're already optimized in most areas!")
-
-        # Download results
-        st.divider()
-        results_data = {
-            'Chronological Age': chron_age,
-            'THA (Population)': result_pop.THA,
-            'Age Acceleration (Population)': result_pop.AgeAccel,
-            'THA (Optimal)': result_opt.THA,
-            'Age Acceleration (Optimal)': result_opt.AgeAccel,
-            **{f'Domain_{k}_Pop': v for k, v in result_pop.domainYears.items()},
-            **{f'Domain_{k}_Opt': v for k, v in result_opt.domainYears.items()}
-        }
-        results_df = pd.DataFrame([results_data])
-        csv = results_df.to_csv(index=False)
-
-        st.download_button(
-            label="📥 Download Results (CSV)",
-            data=csv,
-            file_name=f"tha_results_{chron_age}yo.csv",
-            mime="text/csv"
-        )
+    if submitted:
+        st.session_state.answers = collect_answers()
+        # hashed once per submit; every cached lookup on later reruns reuses it
+        st.session_state.answers_digest = answers_digest(st.session_state.answers)
+        # the submit already triggered this rerun and the results tab renders below
+        st.session_state.show_results = True
 
+with tab2:
+    if st.session_state.show_results:
+        render_results(chron_age)
     else:
         st.info("👈 Complete the questionnaire in the first tab to see your results!")
 
 with tab3:
     if st.session_state.show_results:
-        st.header("🔍 What-If Analysis")
-        st.write("See how specific lifestyle changes would affect your True Health Age")
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.subheader("Proposed Changes")
-
-            changes = {}
-
-            change_sleep = st.checkbox("Improve sleep")
-            if change_sleep:
-                new_sleep = st.slider("New sleep hours", 6.0, 9.0, 8.0, 0.5)
-                changes['sleep_hours'] = new_sleep
-
-            change_cardio = st.checkbox("Increase cardio")
-            if change_cardio:
-                new_cardio = st.slider("New cardio days/week", 0, 7, 5)
-                changes['cardio_days_week'] = new_cardio
-
-            change_strength = st.checkbox("Increase strength training")
-            if change_strength:
-                new_strength = st.slider("New strength days/week", 0, 7, 4)
-                changes['strength_days_week'] = new_strength
-
-            change_diet = st.checkbox("Improve diet")
-            if change_diet:
-                changes['veg_servings_day'] = 4  # 6+ servings
-                changes['fruit_servings_day'] = 3  # 3+ servings
-                changes['fried_foods_week'] = 3  # Never
-
-            change_stress = st.checkbox("Reduce stress")
-            if change_stress:
-                changes['stress_frequency_30d'] = 4  # Almost never
-
-            if st.button("Calculate Impact", use_container_width=True):
-                if changes:
-                    what_if = engine_pop.what_if(float(chron_age), st.session_state.answers, changes)
-
-                    with col2:
-                        st.subheader("Projected Results")
-
-                        improvement = what_if['old_THA'] - what_if['new_THA']
-
-                        st.metric(
-                            label="Current THA",
-                            value=f"{what_if['old_THA']:.1f} years"
-                        )
-
-                        st.metric(
-                            label="New THA",
-                            value=f"{what_if['new_THA']:.1f} years",
-                            delta=f"{-improvement:.1f} years"
-                        )
-
-                        if improvement > 0:
-                            st.success(f"🎉 You could reduce your biological age by **{improvement:.1f} years**!")
-                        elif improvement < 0:
-                            st.warning(f"⚠️ These changes would increase age by {-improvement:.1f} years")
-                        else:
-                            st.info("No significant change")
-                else:
-                    with col2:
-                        st.warning("Select at least one change to analyze")
+        render_what_if(chron_age)
     else:
         st.info("👈 Calculate your THA first to use What-If Analysis!")
 
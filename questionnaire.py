@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+True Health Age - declarative questionnaire layout
+- One QSpec per widget; the Streamlit app renders them with a single dispatcher.
+- Option/label tuples live here (imported once) instead of being rebuilt per rerun.
+- Defaults are the OPTIMAL answers for a 25-30 year old (best bin = rightmost).
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+@dataclass(frozen=True)
+class QSpec:
+    key: str                      # engine item id (widget key is "q_<key>")
+    kind: str                     # number | slider | select_slider | radio | selectbox | multiselect | text_area
+    label: str
+    options: Tuple[Any, ...] = ()
+    labels: Tuple[str, ...] = ()  # display label per option index (select_slider/radio)
+    default: Any = None
+    help: Optional[str] = None
+    min_value: Any = None
+    max_value: Any = None
+    step: Any = None
+    placeholder: Optional[str] = None
+
+@dataclass(frozen=True)
+class Section:
+    title: str
+    expanded: bool
+    columns: Tuple[Tuple[QSpec, ...], ...]  # one tuple of questions per column
+
+SECTIONS: Tuple[Section, ...] = (
+    Section("🏃 Body & Energy (11 questions)", True, (
+        (
+            QSpec("height", "number", "Height (inches)", min_value=48, max_value=84,
+                  default=70,  # 5'10"
+                  help="Your height in inches (1 inch = 2.54 cm)"),
+            QSpec("weight", "number", "Weight (pounds)", min_value=80, max_value=400,
+                  default=160,  # BMI ~23 (optimal)
+                  help="Your weight in pounds (1 lb = 0.45 kg)"),
+            QSpec("waist_circumference", "number", "Waist circumference (inches)", min_value=20, max_value=60,
+                  default=32,  # Optimal range for male
+                  help="Measure at belly button level"),
+            QSpec("gender", "selectbox", "Gender (for waist calculation)",
+                  options=("male", "female"), default="male"),
+            QSpec("pregnancy_breastfeeding", "multiselect", "Are you pregnant or breastfeeding?",
+                  options=("Pregnant", "Breastfeeding", "Neither", "Prefer not to say"), default=("Neither",)),
+            QSpec("sleep_hours", "slider", "Hours of sleep per night", min_value=3.0, max_value=12.0,
+                  default=8.0, step=0.5),  # Optimal sleep
+        ),
+        (
+            QSpec("stress_frequency_30d", "select_slider", "Stress frequency (past 30 days)",
+                  options=(0, 1, 2, 3, 4), default=4,  # Almost never (BEST)
+                  labels=("Very often", "Often", "Sometimes", "Rarely", "Almost never")),
+            QSpec("energy_pattern", "select_slider", "Daytime energy pattern",
+                  options=(0, 1, 2, 3, 4), default=4,  # Steady (BEST)
+                  labels=("Very low crashes", "Low most day", "Up and down", "Steady w/dips", "Steady")),
+            QSpec("rested_feeling", "select_slider", "Feel rested after sleep?",
+                  options=(0, 1, 2, 3, 4), default=4,  # Fully refreshed (BEST)
+                  labels=("Never rested", "Rarely rested", "Sometimes rested", "Mostly rested", "Fully refreshed")),
+            QSpec("screen_time_before_bed", "select_slider", "Screen time 2h before bed",
+                  options=(0, 1, 2, 3, 4), default=4,  # None (BEST)
+                  labels=("2+ hours", "1-2 hours", "30-60 min", "15-30 min", "None")),
+            QSpec("recent_illness", "radio", "Illness in past 2 weeks?",
+                  options=(0, 1, 2), default=2,  # No (BEST)
+                  labels=("Yes, severe", "Yes, moderate", "No")),
+        ),
+    )),
+    Section("💪 Movement & Metabolism (4 questions)", False, (
+        (
+            QSpec("daytime_activity", "select_slider", "Daytime activity pattern",
+                  options=(0, 1, 2, 3, 4, 5), default=4,  # Active job (BEST)
+                  labels=("Mostly sitting", "Mostly standing", "Light movement", "Regular walking",
+                          "Active job", "Very active")),
+            QSpec("strength_days_week", "slider", "Strength training days/week", min_value=0, max_value=7,
+                  default=5),  # 5 days/week (optimal)
+        ),
+        (
+            QSpec("cardio_days_week", "slider", "Cardio days/week", min_value=0, max_value=7,
+                  default=6),  # 6 days/week (optimal)
+            QSpec("eating_window_hours", "slider", "Daily eating window (hours)", min_value=6, max_value=18,
+                  default=10,  # 10 hours (time-restricted feeding)
+                  help="Time between first and last meal"),
+        ),
+    )),
+    Section("🥗 Diet & Gut Health (13 questions)", False, (
+        (
+            QSpec("seed_oils_freq", "select_slider", "Seed oil consumption",
+                  options=(0, 1, 2), default=2,  # Rarely/Never (BEST)
+                  labels=("Regularly", "Sometimes", "Rarely/Never")),
+            QSpec("home_cooking_fat", "select_slider", "Primary cooking fat",
+                  options=(0, 1, 2, 3, 4), default=2,
+                  labels=("Vegetable oil", "Canola oil", "Olive oil", "Coconut oil", "Animal fat")),
+            QSpec("fried_foods_week", "select_slider", "Fried foods frequency",
+                  options=(0, 1, 2, 3), default=2,
+                  labels=("Several times/week", "2-3 times/week", "Once/week", "Never")),
+            QSpec("fruit_servings_day", "select_slider", "Fruit servings/day",
+                  options=(0, 1, 2, 3), default=1,
+                  labels=("<1", "1", "2", "3+")),
+            QSpec("veg_servings_day", "select_slider", "Vegetable servings/day",
+                  options=(0, 1, 2, 3, 4), default=2,
+                  labels=("1 or less", "2-3", "4-5", "6+", "6+")),
+            QSpec("packaged_foods_week", "select_slider", "Packaged/processed foods",
+                  options=(0, 1, 2, 3), default=2,
+                  labels=("Daily", "Often", "Sometimes", "Rarely")),
+            QSpec("reading_labels", "select_slider", "Read ingredient labels?",
+                  options=(0, 1, 2), default=1,
+                  labels=("Never", "Sometimes", "Always")),
+        ),
+        (
+            QSpec("artificial_sweeteners_week", "select_slider", "Artificial sweeteners/week",
+                  options=(0, 1, 2, 3, 4, 5), default=2,
+                  labels=("5-6", "3-4", "1-2", "Occasionally", "Not sure", "None")),
+            QSpec("restaurant_meals_week", "select_slider", "Restaurant meals/week",
+                  options=(0, 1, 2, 3, 4), default=2,
+                  labels=("5+", "3-4", "1-2", "None", "Not sure")),
+            QSpec("fiber_foods_freq", "select_slider", "Fiber-rich foods frequency",
+                  options=(0, 1, 2, 3, 4), default=2,
+                  labels=("Rarely", "Few times/week", "Once/day", "Twice/day", "Multiple/day")),
+            QSpec("bowel_movements_day", "slider", "Bowel movements/day", min_value=0, max_value=6,
+                  default=1),
+            QSpec("digestive_issues_30d", "select_slider", "Digestive issues (past 30 days)",
+                  options=(0, 1, 2, 3), default=2,
+                  labels=("10+", "6-9", "2-5", "0-1")),
+            QSpec("antibiotics_12mo", "radio", "Antibiotics (past 12 months)",
+                  options=(0, 1, 2, 3), default=3,
+                  labels=("2+ courses", "1 course", "Not sure", "No")),
+        ),
+    )),
+    Section("🌍 Environment & Exposure (9 questions)", False, (
+        (
+            QSpec("nicotine_past_30_days", "radio", "Nicotine use (past 30 days)",
+                  options=(0, 1, 2, 3), default=3,
+                  labels=("Yes, daily", "Yes, few times/week", "Yes, occasionally", "No, not at all")),
+            QSpec("nicotine_history", "radio", "Nicotine use (history)",
+                  options=(0, 1, 2, 3), default=3,
+                  labels=("Still use daily", "Quit <12mo", "Quit >1yr", "Never used")),
+            QSpec("alcohol_days_30", "select_slider", "Alcohol days (past 30)",
+                  options=(0, 1, 2, 3, 4, 5), default=3,
+                  labels=("20-30", "10-19", "3-9", "1-2", "0", "Prefer not to say")),
+            QSpec("alcohol_drinks_per_day", "select_slider", "Drinks per drinking day",
+                  options=(0, 1, 2, 3, 4, 5), default=4,
+                  labels=("3+", "2", "1 or less", "None", "Not sure", "Prefer not to say")),
+            QSpec("sunlight_minutes_day", "select_slider", "Sunlight exposure/day",
+                  options=(0, 1, 2, 3, 4), default=2,
+                  labels=("<15min", "15-30min", "30-60min", "60+min", "60+min")),
+        ),
+        (
+            QSpec("plastic_exposure", "select_slider", "Plastic container/bottle use",
+                  options=(0, 1, 2, 3, 4), default=2,
+                  labels=("Daily", "4-6/week", "1-3/week", "Rarely", "Not sure")),
+            QSpec("wifi_router_night", "radio", "Wi-Fi router on at night?",
+                  options=(0, 1, 2, 3), default=1,
+                  labels=("Every night in bedroom", "Every night elsewhere", "Some nights", "Turn it off")),
+            QSpec("phone_bedroom", "radio", "Phone in bedroom at night?",
+                  options=(0, 1, 2, 3), default=2,
+                  labels=("On all night", "Nearby but off", "Airplane mode", "Outside bedroom")),
+            QSpec("wireless_earbuds", "radio", "Wireless earbud use",
+                  options=(0, 1, 2, 3), default=2,
+                  labels=("3+ hours/day", "1-3 hours/day", "<1 hour/day", "Don't use")),
+        ),
+    )),
+    Section("🏥 Health History (2 questions)", False, (
+        (
+            QSpec("family_history", "multiselect", "Family health history (select all that apply)",
+                  options=("Thyroid disease", "Type 2 diabetes", "Autoimmune disease",
+                           "Heart disease", "High cholesterol", "Obesity", "Cancer", "None", "Not sure"),
+                  default=("None",)),
+            QSpec("personal_conditions", "multiselect", "Personal health conditions (select all that apply)",
+                  options=("High blood pressure", "High cholesterol", "Thyroid disorder",
+                           "Autoimmune disease", "Digestive disorder", "Mental health condition",
+                           "Chronic pain", "None", "Other"),
+                  default=("None",)),
+        ),
+    )),
+    Section("💊 Supplements (1 question)", False, (
+        (
+            QSpec("supplements_use", "radio", "Take supplements regularly?",
+                  options=(0, 1, 2, 3), default=1,
+                  labels=("No", "Sometimes", "Regularly (most days)", "Yes, daily")),
+        ),
+    )),
+    Section("📝 Additional Notes (optional)", False, (
+        (
+            QSpec("additional_notes", "text_area", "Any additional health information?",
+                  placeholder="Enter any additional notes here (optional)...",
+                  help="This field does not affect scoring"),
+        ),
+    )),
+)
+
+QUESTIONS: Tuple[QSpec, ...] = tuple(q for sec in SECTIONS for col in sec.columns for q in col)
+
+# Engine item ids answered by the questionnaire ("gender" only qualifies the waist answer)
+QUESTION_KEYS: Tuple[str, ...] = tuple(q.key for q in QUESTIONS if q.key != "gender")
+
+# Questions answered with a multiselect (sent to the engine as option bitmasks)
+MULTISELECT_KEYS: Tuple[str, ...] = tuple(q.key for q in QUESTIONS if q.kind == "multiselect")
+
+QUESTIONS_BY_KEY: Dict[str, QSpec] = {q.key: q for q in QUESTIONS}
+
+# Questions offered in the What-If tab (rendered with the same QSpec as the questionnaire)
+WHAT_IF_KEYS: Tuple[str, ...] = ("sleep_hours", "cardio_days_week", "strength_days_week", "veg_servings_day",
+                                 "fruit_servings_day", "fried_foods_week", "stress_frequency_30d")
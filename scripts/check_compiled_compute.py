@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Randomized equivalence check for the generated THAEngine.compute().
+- Draws random answer sets from each config's own items (options, ranges, multi-selects, omissions).
+- Compares compute() with compute_vec() exactly and with compute_batch() on the same rows.
+- Also runs each config with one domain's ln_cap_hi and the age clamp set to inf (non-finite literals).
+Run after touching _compile_compute, compute_vec or the config tables; exits non-zero on a mismatch.
+"""
+
+import argparse, copy, math, random, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from tha_engine import THAEngine, load_config
+
+def random_answers(cfg, rng):
+    """One respondent: every item answered in a form compute() accepts, about 5% left blank."""
+    answers = {}
+    for it in cfg["items"]:
+        iid = it["id"]
+        if rng.random() < 0.05:
+            continue
+        if iid == "height":
+            answers[iid] = rng.randint(48, 84)
+        elif iid == "weight":
+            answers[iid] = rng.randint(80, 400)
+        elif it.get("input_type") == "free_text":
+            answers[iid] = rng.choice(["", "notes"])
+        elif "multi_options" in it:
+            opts = list(it["multi_options"])
+            answers[iid] = rng.sample(opts, rng.randint(0, min(4, len(opts))))
+        elif "options_range" in it:
+            rows = it["options_range"]
+            bounds = [float(r[k]) for r in rows for k in ("min", "max") if math.isfinite(float(r[k]))]
+            # in-range values only (out-of-range answers raise in every path); whole numbers when the
+            # bins are whole numbers, e.g. days per week
+            value = rng.uniform(min(bounds), max(bounds))
+            value = round(value) if rng.random() < 0.5 or all(x.is_integer() for x in bounds) else round(value * 2) / 2
+            genders = sorted({r["gender"] for r in rows if "gender" in r})
+            answers[iid] = (value, rng.choice(genders)) if genders else value
+        elif "options" in it:
+            if rng.random() < 0.3:
+                answers[iid] = rng.choice(list(it["options"]))
+            else:
+                answers[iid] = rng.randint(0, len(it["hr"]) - 1)
+    return answers
+
+def non_finite(cfg):
+    """Copy of cfg with the first domain's upper cap and the age clamp switched off via inf."""
+    cfg = copy.deepcopy(cfg)
+    cfg["domains"][next(iter(cfg["domains"]))]["ln_cap_hi"] = math.inf
+    cfg["age_clamp_years"] = math.inf
+    return cfg
+
+def check(name, engine, n, rng):
+    bad = 0
+    answers_list = [random_answers(engine.cfg, rng) for _ in range(n)]
+    ages = np.array([float(rng.randint(18, 100)) for _ in range(n)])
+    batch = engine.compute_batch(ages, engine.encode_batch(answers_list))
+    for row, (age, answers) in enumerate(zip(ages.tolist(), answers_list)):
+        got = engine.compute(age, answers)
+        ref = engine.compute_vec(age, engine.encode_answers(answers))
+        ref_items = {k: v for k, v in ref.itemYears.items() if k in got.itemYears}
+        same = (got.THA == ref.THA and got.AgeAccel == ref.AgeAccel and got.domainYears == ref.domainYears
+                and list(got.itemYears.items()) == list(ref_items.items()) and got.item_ids == tuple(got.itemYears)
+                and got.algo_version == ref.algo_version and got.b == ref.b and got.groups is ref.groups)
+        same = same and math.isclose(batch.THA[row], got.THA, rel_tol=1e-12) and np.allclose(
+            batch.domainYears[row], [got.domainYears[d] for d in batch.domain_names], rtol=1e-12, atol=1e-15)
+        if not same:
+            bad += 1
+            if bad <= 5:
+                print(f"  mismatch at row {row}: compute THA={got.THA!r}, compute_vec THA={ref.THA!r}, "
+                      f"compute_batch THA={batch.THA[row]!r}")
+    print(f"{name}: {n} answer sets, {bad} mismatches")
+    return bad
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check generated compute() against compute_vec/compute_batch.")
+    parser.add_argument("configs", nargs="*",
+                        default=[str(ROOT / "config.yaml"), str(ROOT / "config_optimal.yaml")])
+    parser.add_argument("-n", type=int, default=10000, help="random answer sets per config")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    bad = 0
+    for config_path in args.configs:
+        cfg = load_config(config_path)
+        bad += check(config_path, THAEngine(cfg), args.n, rng)
+        bad += check(f"{config_path} (inf caps)", THAEngine(non_finite(cfg)), args.n, rng)
+    sys.exit(1 if bad else 0)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precompile THA engines for fast start-up.
+- Parses each YAML config once and builds its THAEngine (all derived tables).
+- Pickles the engine state next to the config as <config>.engine.pkl.
+- tha_engine.load_engine() uses the pickle while it is at least as new as the config.
+Re-run after editing a config (a stale pickle is ignored, so forgetting only costs speed).
+"""
+
+import argparse, pickle, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tha_engine import THAEngine, engine_state_path, load_config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pickle precompiled THA engine states.")
+    parser.add_argument("configs", nargs="*",
+                        default=[str(ROOT / "config.yaml"), str(ROOT / "config_optimal.yaml")])
+    args = parser.parse_args()
+    for config_path in args.configs:
+        state = THAEngine(load_config(config_path)).to_state()
+        out = engine_state_path(config_path)
+        out.write_bytes(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+        print(f"{config_path} -> {out}")
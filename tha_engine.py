@@ -8,23 +8,96 @@ True Health Age (THA) - Deterministic Hazard->Age Engine (no ML)
 - Returns domain and item contributions in years, plus group ordering for UI.
 """
 
-import json, math
+import bisect, functools, json, math, os, pickle, sys, threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+import numpy as np
 
 try:
     import yaml  
 except Exception:
     yaml = None
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit, prange = None, range
+
 def gompertz_b(mrdt_years: float) -> float:
     if mrdt_years <= 0:
         raise ValueError("MRDT must be positive")
     return math.log(2.0) / mrdt_years
 
-@dataclass(frozen=True)
-class THAResult:
+# BMI risk categories (see THAEngine._bmi_to_bin) and the missing-data penalty
+_BMI_CUTS = (18.5, 25.0, 30.0, 35.0)
+_BMI_HR = (1.20, 1.00, 1.15, 1.40, 1.80)
+_BMI_MISSING_HR = 1.05
+_BMI_LN_HR = tuple(math.log(h) for h in _BMI_HR)
+_BMI_MISSING_LN_HR = math.log(_BMI_MISSING_HR)
+_BMI_INPUTS = ("height", "weight")
+# vector lane bin used when height/weight were not answered at all (no BMI contribution)
+_BMI_NOT_GIVEN = len(_BMI_HR)
+
+# gender codes for gender-keyed ranges; (value, gender) answers may use the name or its index
+GENDERS = ("male", "female")
+
+def _batch_domain_ln(bins, hr_log, missing_ln, dom_of_item, dom_lo, dom_hi):
+    """
+    Capped ln(HR) per domain for each row of an encoded (rows, lanes) bin matrix. Written as
+    plain loops for Numba (parallel over rows); without Numba compute_batch uses the equivalent
+    NumPy gather + one-hot matmul instead.
+    """
+    n_rows, n_lanes = bins.shape
+    out = np.zeros((n_rows, dom_lo.shape[0]))
+    for r in prange(n_rows):
+        for i in range(n_lanes):
+            k = bins[r, i]
+            out[r, dom_of_item[i]] += hr_log[i, k] if k >= 0 else missing_ln[i]
+        for d in range(dom_lo.shape[0]):
+            out[r, d] = min(max(out[r, d], dom_lo[d]), dom_hi[d])
+    return out
+
+def _lane_domain_ln(bins, hr_log, missing_ln, dom_of_item, dom_lo, dom_hi):
+    """
+    ln(HR) per lane and capped ln(HR) per domain for one encoded answer vector; the Numba
+    counterpart of compute_vec's NumPy gather/bincount/clip (used when numba is installed).
+    """
+    lnhr = np.empty(bins.shape[0])
+    per_domain = np.zeros(dom_lo.shape[0])
+    for i in range(bins.shape[0]):
+        k = bins[i]
+        lnhr[i] = hr_log[i, k] if k >= 0 else missing_ln[i]
+        per_domain[dom_of_item[i]] += lnhr[i]
+    for d in range(per_domain.shape[0]):
+        per_domain[d] = min(max(per_domain[d], dom_lo[d]), dom_hi[d])
+    return lnhr, per_domain
+
+if njit is not None:
+    _batch_domain_ln = njit(cache=True, parallel=True)(_batch_domain_ln)
+    _lane_domain_ln = njit(cache=True)(_lane_domain_ln)
+
+class OptionMask(int):
+    """Multi-select answer packed as a bitmask over the item's multi_options (bit i = option i)."""
+    __slots__ = ()
+
+class _ItemYearsVecSlot:
+    """THAResult's itemYears_vec cache: a plain slot, so fields()/asdict()/replace()/repr() never see it."""
+    __slots__ = ("_itemYears_vec",)
+
+@dataclass(frozen=True, slots=True)
+class THAResult(_ItemYearsVecSlot):
+    """
+    item_ids is the key order of itemYears and itemYears_vec the same values as an array in that
+    order; compute_vec hands over its lane array, otherwise it is built on first access.
+    """
     THA: float
     AgeAccel: float
     domainYears: Dict[str, float]
@@ -33,6 +106,29 @@ class THAResult:
     b: float
     groups: Dict[str, List[str]]
 
+    @property
+    def item_ids(self) -> Tuple[str, ...]:
+        return tuple(self.itemYears)
+
+    @property
+    def itemYears_vec(self) -> np.ndarray:
+        try:
+            return self._itemYears_vec
+        except AttributeError:
+            vec = np.fromiter(self.itemYears.values(), float, len(self.itemYears))
+            object.__setattr__(self, "_itemYears_vec", vec)  # frozen
+            return vec
+
+@dataclass(frozen=True, slots=True)
+class BatchResult:
+    """compute_batch() output, one entry per row; domainYears is (rows, domains) in domain_names order."""
+    THA: np.ndarray
+    AgeAccel: np.ndarray
+    domainYears: np.ndarray
+    domain_names: Tuple[str, ...]
+    algo_version: str
+    b: float
+
 def _score_multiselect(item: Dict[str, Any], selected: List[str]) -> float:
     """
     Score multi-select questions based on selected options and their weights.
@@ -61,15 +157,50 @@ def _score_multiselect(item: Dict[str, Any], selected: List[str]) -> float:
 
     return total_score
 
+def _parse_ranges(item: Dict[str, Any]) -> Dict[Optional[str], tuple]:
+    """
+    Pre-parse options_range into per-gender lookup tables (None = not gender-keyed):
+    (los sorted ascending, his, bins) for bisection, plus the ranges in YAML order when
+    they overlap (first match must then win, so the lookup falls back to a scan).
+    """
+    parsed: Dict[Optional[str], List[tuple]] = {}
+    for rng in item["options_range"]:
+        lo = rng.get("min", float("-inf"))
+        hi = rng.get("max", float("inf"))
+        lo = float("-inf") if lo in ("-inf", None) else float(lo)
+        hi = float("inf")  if hi in ("inf", None)  else float(hi)
+        parsed.setdefault(rng.get("gender"), []).append((lo, hi, int(rng["bin"])))
+    tables = {}
+    for gender, ranges in parsed.items():
+        by_lo = sorted(ranges, key=lambda r: r[0])
+        overlaps = any(b[0] <= a[1] for a, b in zip(by_lo, by_lo[1:]))
+        los, his, bins = (tuple(col) for col in zip(*by_lo))
+        tables[gender] = (los, his, bins, tuple(ranges) if overlaps else None)
+    return tables
+
+def _range_to_bin(table: tuple, value: float) -> Optional[int]:
+    """Bin of the range containing value (bounds inclusive), or None if it falls in no range."""
+    los, his, bins, ordered = table
+    if ordered is not None:
+        return next((b for lo, hi, b in ordered if lo <= value <= hi), None)
+    i = bisect.bisect_right(los, value) - 1
+    return bins[i] if i >= 0 and value <= his[i] else None
+
 def _raw_to_bin(item: Dict[str, Any], raw: Optional[Union[str, float, int, List]]) -> Optional[int]:
     """Map a raw form value to bin index 0..N based on YAML options or ranges."""
     if raw is None:
         return None
 
-    max_bin = len(item["hr"]) - 1  # Support variable-length HR arrays
+    max_bin = item["_max_bin"] if "_max_bin" in item else len(item["hr"]) - 1  # Support variable-length HR arrays
+
+    # Multi-select bitmask: bins for every mask are precomputed at engine init
+    if isinstance(raw, OptionMask) and "_mask_bins" in item:
+        if not 0 <= raw < len(item["_mask_bins"]):
+            raise ValueError(f"Option mask {int(raw)} out of range for {item['id']}")
+        return item["_mask_bins"][raw]
 
-    # Multi-select handling (list of selected options)
-    if isinstance(raw, list) and item.get("input_type") == "multi_select":
+    # Multi-select handling (list/tuple of selected options)
+    if isinstance(raw, (list, tuple)) and item.get("input_type") == "multi_select":
         score = _score_multiselect(item, raw)
 
         # Map score to bins based on thresholds
@@ -97,11 +228,12 @@ def _raw_to_bin(item: Dict[str, Any], raw: Optional[Union[str, float, int, List]
         mapping = item["options"]
         if raw not in mapping:
             raise ValueError(f"Unknown option '{raw}' for {item['id']}")
-        return int(mapping[raw])
+        return mapping[raw]
     # numeric ranges (value -> bin)
     if "options_range" in item and (isinstance(raw, (int, float)) or isinstance(raw, tuple)):
+        tables = item["_ranges"] if "_ranges" in item else _parse_ranges(item)
         # Check if this is a gender-specific question
-        has_gender_ranges = any("gender" in rng for rng in item["options_range"])
+        has_gender_ranges = any(g is not None for g in tables)
 
         if has_gender_ranges:
             # Need to get gender from context (passed as tuple: (value, gender))
@@ -111,25 +243,15 @@ def _raw_to_bin(item: Dict[str, Any], raw: Optional[Union[str, float, int, List]
                 # Default to male thresholds if gender not specified
                 value = raw
                 gender = "male"
-
-            for rng in item["options_range"]:
-                if rng.get("gender") != gender:
-                    continue
-                lo = rng.get("min", float("-inf"))
-                hi = rng.get("max", float("inf"))
-                lo = float("-inf") if lo in ("-inf", None) else float(lo)
-                hi = float("inf")  if hi in ("inf", None)  else float(hi)
-                if lo <= float(value) <= hi:
-                    return int(rng["bin"])
+            if isinstance(gender, int):
+                gender = GENDERS[gender]
+            table = tables.get(gender)
+            bin_idx = _range_to_bin(table, float(value)) if table is not None else None
         else:
             # Standard numeric range matching
-            for rng in item["options_range"]:
-                lo = rng.get("min", float("-inf"))
-                hi = rng.get("max", float("inf"))
-                lo = float("-inf") if lo in ("-inf", None) else float(lo)
-                hi = float("inf")  if hi in ("inf", None)  else float(hi)
-                if lo <= float(raw) <= hi:
-                    return int(rng["bin"])
+            bin_idx = _range_to_bin(tables[None], float(raw))
+        if bin_idx is not None:
+            return bin_idx
 
         raise ValueError(f"Value {raw} not in any range for {item['id']}")
     # direct bin index (0 to max_bin)
@@ -137,7 +259,17 @@ def _raw_to_bin(item: Dict[str, Any], raw: Optional[Union[str, float, int, List]
         return raw
     raise ValueError(f"Cannot interpret answer for {item['id']}: {raw}")
 
+def _lane_bin(item: Dict[str, Any], raw: Any) -> int:
+    """_raw_to_bin() for a vector lane: -1 when unanswered or unscored."""
+    bin_idx = _raw_to_bin(item, raw) if raw is not None else None
+    return -1 if bin_idx is None else bin_idx
+
 class THAEngine:
+    # bump whenever the attributes derived in __init__ change (invalidates pickled states)
+    STATE_VERSION = 9
+    # per-process attributes rebuilt by _init_transient() instead of being pickled
+    _TRANSIENT = ("_tls", "_compute_fn", "_cached_bin")
+
     def __init__(self, cfg: Dict[str, Any]):
         self.cfg = cfg
         self.version = cfg.get("algo_version", "THA-unknown")
@@ -145,14 +277,72 @@ class THAEngine:
         self.b = gompertz_b(self.mrdt_years)
         self.age_clamp_years = float(cfg.get("age_clamp_years", 10.0))
         self.domains = cfg["domains"]
-        # sort items by declared order to match UX flow
-        self.items = sorted(cfg["items"], key=lambda it: it.get("order", 999))
+        # sort items by declared order to match UX flow (shallow copies: init adds derived keys);
+        # the index breaks ties, so equal orders keep their config order as a stable sort would
+        order_keys = sorted((it.get("order", 999), i) for i, it in enumerate(cfg["items"]))
+        self.items = [dict(cfg["items"][i]) for _, i in order_keys]
         # build groups (section -> ordered item ids)
         self.groups: Dict[str, List[str]] = {}
         for it in self.items:
             grp = it.get("group", "ungrouped")
             self.groups.setdefault(grp, []).append(it["id"])
+        for it in self.items:
+            it["id"] = sys.intern(it["id"])
+        self._items_by_id = {it["id"]: it for it in self.items}
         self._validate()
+        for it in self.items:
+            it["_max_bin"] = len(it["hr"]) - 1
+            # ln(HR) per bin and for a missing answer: config invariants, taken once here
+            it["_ln_hr"] = tuple(math.log(h) for h in it["hr"])
+            it["_ln_missing"] = math.log(it.get("missing_hr", 1.0))
+            # months gained by moving one bin up from each bin (0.0 from the best bin)
+            it["_gain_months"] = tuple((it["_ln_hr"][k] - it["_ln_hr"][k + 1]) / self.b * 12.0
+                                       for k in range(it["_max_bin"])) + (0.0,)
+            if "options" in it:
+                # int bins and interned option codes, so lookups need no per-call cast
+                it["options"] = {sys.intern(k) if isinstance(k, str) else k: int(v) for k, v in it["options"].items()}
+            if "options_range" in it:
+                it["_ranges"] = _parse_ranges(it)
+        self._build_option_masks()
+        # (id, gain table) per item in order, so one_step_gains_months walks a flat tuple
+        self._gain_rows = tuple((it["id"], it["_gain_months"]) for it in self.items)
+        self._build_vectors()
+        self._init_transient()
+
+    def _init_transient(self) -> None:
+        # compute_vec scratch arrays, one set per thread (Streamlit runs sessions on several threads)
+        self._tls = threading.local()
+        # generated on first compute() (see _compile_compute), so loading a pickled state stays cheap
+        self._compute_fn = None
+        # per-engine memo of (item id, raw answer) -> bin; typed so 1, 1.0 and True stay distinct
+        self._cached_bin = functools.lru_cache(maxsize=4096, typed=True)(self._resolve_bin)
+
+    def _resolve_bin(self, item_id: str, raw: Any) -> Optional[int]:
+        return _raw_to_bin(self._items_by_id[item_id], raw)
+
+    def _item_bin(self, item_id: str, raw: Any) -> Optional[int]:
+        """_raw_to_bin() through the per-engine memo; multi-select lists are keyed as tuples."""
+        if isinstance(raw, list):
+            raw = tuple(raw)
+        try:
+            return self._cached_bin(item_id, raw)
+        except TypeError:  # unhashable answer: resolve directly
+            return _raw_to_bin(self._items_by_id[item_id], raw)
+
+    def to_state(self) -> Dict[str, Any]:
+        """Snapshot of the built engine (config + derived tables) for pickling; see from_state()."""
+        attrs = {k: v for k, v in self.__dict__.items() if k not in self._TRANSIENT}
+        return {"version": self.STATE_VERSION, "attrs": attrs}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "THAEngine":
+        """Restore an engine from to_state() without re-parsing or re-deriving anything."""
+        if state.get("version") != cls.STATE_VERSION:
+            raise ValueError(f"Engine state version {state.get('version')} does not match {cls.STATE_VERSION}")
+        eng = cls.__new__(cls)
+        eng.__dict__.update(state["attrs"])
+        eng._init_transient()
+        return eng
 
     def _calculate_bmi(self, height_val: Optional[float], weight_val: Optional[float],
                        height_unit: str = "cm", weight_unit: str = "kg") -> Optional[float]:
@@ -185,9 +375,9 @@ class THAEngine:
         bmi = weight_kg / (height_m ** 2)
         return bmi
 
-    def _bmi_to_lnhr(self, bmi: Optional[float]) -> float:
+    def _bmi_to_bin(self, bmi: Optional[float]) -> Optional[int]:
         """
-        Map BMI to ln(HR) based on established risk categories.
+        Map BMI to its risk category (index into _BMI_HR).
         BMI categories:
           <18.5: Underweight (HR ~1.20)
           18.5-24.9: Normal (HR 1.00, reference)
@@ -196,18 +386,9 @@ class THAEngine:
           35+: Obese Class II+ (HR ~1.80)
         """
         if bmi is None:
-            return math.log(1.05)  # Missing data penalty
-
-        if bmi < 18.5:
-            return math.log(1.20)  # Underweight
-        elif bmi < 25.0:
-            return math.log(1.00)  # Normal (reference)
-        elif bmi < 30.0:
-            return math.log(1.15)  # Overweight
-        elif bmi < 35.0:
-            return math.log(1.40)  # Obese Class I
-        else:
-            return math.log(1.80)  # Obese Class II+
+            return None
+        # lower bounds are inclusive: 25.0 is Overweight
+        return bisect.bisect_right(_BMI_CUTS, bmi)
 
     def _validate(self) -> None:
         for d, caps in self.domains.items():
@@ -222,98 +403,353 @@ class THAEngine:
             # Validate bins field matches HR length
             if "bins" in it and len(it["bins"]) != len(it["hr"]):
                 raise ValueError(f"{it['id']}: bins length ({len(it['bins'])}) must match hr length ({len(it['hr'])})")
-
-    def _item_lnhr(self, item: Dict[str, Any], bin_index: Optional[int]) -> float:
-        hr = item["hr"][bin_index] if bin_index is not None else item.get("missing_hr", 1.0)
-        if hr <= 0:
-            raise ValueError(f"HR must be >0 for {item['id']}")
-        return math.log(hr)
+            if min(it["hr"]) <= 0 or it.get("missing_hr", 1.0) <= 0:
+                raise ValueError(f"HR must be >0 for {it['id']}")
+            # every bin an answer can map to must index into hr (the vector path gathers by bin)
+            mapped = list(it.get("options", {}).values()) + [rng["bin"] for rng in it.get("options_range", [])]
+            if any(not 0 <= int(b) < len(it["hr"]) for b in mapped):
+                raise ValueError(f"{it['id']}: option bins must be within 0..{len(it['hr']) - 1}")
+
+    def _build_option_masks(self) -> None:
+        """
+        For multi-select items, map option name -> bit and precompute the bin of every mask,
+        so OptionMask answers resolve with one tuple index (no per-call string scoring).
+        """
+        self._option_bits: Dict[str, Dict[str, int]] = {}
+        for it in self.items:
+            opts = it.get("multi_options")
+            if it.get("input_type") != "multi_select" or not opts:
+                continue
+            self._option_bits[it["id"]] = {opt: 1 << i for i, opt in enumerate(opts)}
+            it["_mask_bins"] = tuple(
+                _raw_to_bin(it, [opt for i, opt in enumerate(opts) if mask >> i & 1])
+                for mask in range(1 << len(opts))
+            )
+
+    def option_mask(self, item_id: str, selected: List[str]) -> OptionMask:
+        """Pack selected options of a multi-select item; names outside multi_options score 0 and are dropped."""
+        bits = self._option_bits[item_id]
+        mask = 0
+        for opt in selected:
+            mask |= bits.get(opt, 0)
+        return OptionMask(mask)
+
+    def _build_vectors(self) -> None:
+        """
+        Flatten the scored items into fixed lanes for the vector path (encode_answers/compute_vec).
+        Lane 0 is the BMI derived from height/weight, the rest follow item order.
+        Each lane stores ln(HR) per bin (NaN-padded), its missing-data ln(HR) and its domain index.
+        """
+        self._domain_names = tuple(self.domains.keys())
+        dom_index = {d: i for i, d in enumerate(self._domain_names)}
+        self._vec_items = [it for it in self.items if it["id"] not in _BMI_INPUTS]
+        self.vector_ids = ("bmi_calculated",) + tuple(it["id"] for it in self._vec_items)
+        self._vec_lanes = tuple((it["id"], it) for it in self._vec_items)
+
+        n = len(self.vector_ids)
+        width = max([_BMI_NOT_GIVEN + 1] + [len(it["hr"]) for it in self._vec_items])
+        self._hr_log = np.full((n, width), np.nan)
+        self._missing_ln = np.empty(n)
+        self._dom_of_item = np.empty(n, dtype=np.intp)
+
+        self._hr_log[0, :len(_BMI_HR)] = _BMI_LN_HR
+        self._hr_log[0, _BMI_NOT_GIVEN] = 0.0
+        self._missing_ln[0] = _BMI_MISSING_LN_HR
+        self._dom_of_item[0] = dom_index["body"]
+        for i, it in enumerate(self._vec_items, 1):
+            self._hr_log[i, :len(it["hr"])] = it["_ln_hr"]
+            self._missing_ln[i] = it["_ln_missing"]
+            self._dom_of_item[i] = dom_index[it["domain"]]
+        self._lanes = np.arange(n)
+        # lane -> (los, his, bins) arrays for encode_batch's column-wise range lookup
+        # (non-gendered ranges without overlaps only, see _parse_ranges)
+        self._digitize_tables = {
+            i: tuple(np.array(col) for col in it["_ranges"][None][:3])
+            for i, it in enumerate(self._vec_items, 1)
+            if list(it.get("_ranges", ())) == [None] and it["_ranges"][None][3] is None
+        }
+        # the same table flattened with the missing ln(HR) in front of each lane's bins, so a
+        # lane's value is one take() at _lane_base + bin (bin -1 lands on the missing entry)
+        self._ln_table = np.concatenate([self._missing_ln[:, None], self._hr_log], axis=1).ravel()
+        self._lane_base = self._lanes * (width + 1) + 1
+        # lane -> domain one-hot, so a batch reduces to domains with a single matmul
+        self._dom_onehot = np.zeros((n, len(self._domain_names)))
+        self._dom_onehot[self._lanes, self._dom_of_item] = 1.0
+        self._dom_lo = np.array([self.domains[d]["ln_cap_lo"] for d in self._domain_names], dtype=float)
+        self._dom_hi = np.array([self.domains[d]["ln_cap_hi"] for d in self._domain_names], dtype=float)
 
     def compute(self, chron_age_years: float, answers: Dict[str, Any]) -> THAResult:
         """answers may contain raw option strings, numeric values, or direct bin indices (0..N)."""
-        per_domain_ln: Dict[str, float] = {d: 0.0 for d in self.domains.keys()}
-        itemYears: Dict[str, float] = {}
+        fn = self._compute_fn
+        if fn is None:
+            fn = self._compute_fn = self._compile_compute()
+        return fn(answers, chron_age_years)
 
-        # Calculate BMI if height and weight are provided
+    def _compile_compute(self):
+        """
+        Generate compute() specialized to this config: the lane loop is unrolled with the item ids,
+        ln(HR) tables bound by name, and common answer types (option codes, direct bins, plain
+        numbers) resolve inline; anything else goes through _raw_to_bin. Config floats (missing
+        ln(HR), domain caps, b, the age clamp) are bound as named constants rather than spliced in
+        as repr() text, so non-finite values such as ln_cap_hi: .inf still compile.
+        Same arithmetic, in the same order, as compute_vec. BMI is only reported when height and
+        weight were both given.
+        """
+        ns: Dict[str, Any] = {"rb": _raw_to_bin, "rr": _range_to_bin, "bmi_bin": self._bmi_to_bin,
+                              "calc_bmi": self._calculate_bmi, "R": THAResult, "GROUPS": self.groups,
+                              "BMI_LN": _BMI_LN_HR, "BMI_MISS": _BMI_MISSING_LN_HR, "B": self.b,
+                              "CLAMP": self.age_clamp_years}
+        lines = [
+            "def _compiled(answers, chron):",
+            "    get = answers.get",
+            f"    h = get({_BMI_INPUTS[0]!r}); w = get({_BMI_INPUTS[1]!r})",
+            "    if h is not None and w is not None:",
+            "        bmi_given = True",
+            "        k = bmi_bin(calc_bmi(h, w, 'in', 'lbs'))",
+            "        l0 = BMI_MISS if k is None else BMI_LN[k]",
+            "    else:",
+            "        bmi_given = False",
+            "        l0 = 0.0",
+        ]
+        for i, it in enumerate(self._vec_items, 1):
+            miss = f"MISS{i}"
+            ns[miss] = it["_ln_missing"]
+            if it.get("input_type") == "free_text":
+                lines.append(f"    l{i} = {miss}")  # never scored
+                continue
+            ns[f"IT{i}"], ns[f"LN{i}"] = it, it["_ln_hr"]
+            if "options" in it and "_mask_bins" not in it:
+                ns[f"OPT{i}"] = it["options"]
+                fast = f"OPT{i}[raw] if raw.__class__ is str and raw in OPT{i} else "
+                if "options_range" not in it:
+                    fast += f"raw if raw.__class__ is int and 0 <= raw <= {it['_max_bin']} else "
+                resolve = [f"        k = {fast}rb(IT{i}, raw)"]
+            elif "_ranges" in it and list(it["_ranges"]) == [None]:
+                ns[f"TB{i}"] = it["_ranges"][None]
+                resolve = [f"        k = rr(TB{i}, float(raw)) if raw.__class__ is float or raw.__class__ is int else None",
+                           "        if k is None:",
+                           f"            k = rb(IT{i}, raw)"]
+            else:
+                resolve = [f"        k = rb(IT{i}, raw)"]
+            lines += [f"    raw = get({it['id']!r})",
+                      "    if raw is None:",
+                      f"        l{i} = {miss}",
+                      "    else:",
+                      *resolve,
+                      f"        l{i} = {miss} if k is None else LN{i}[k]"]
+        for j, (lo, hi) in enumerate(zip(self._dom_lo.tolist(), self._dom_hi.tolist())):
+            ns[f"LO{j}"], ns[f"HI{j}"] = lo, hi
+            lanes = " + ".join(f"l{i}" for i in np.flatnonzero(self._dom_of_item == j))
+            lines += [f"    d{j} = 0.0" + (f" + {lanes}" if lanes else ""),
+                      f"    if d{j} < LO{j}:",
+                      f"        d{j} = LO{j}",
+                      f"    elif d{j} > HI{j}:",
+                      f"        d{j} = HI{j}"]
+        total = " + ".join(f"d{j}" for j in range(len(self._domain_names)))
+        items = ", ".join(f"{iid!r}: l{i} / B" for i, iid in enumerate(self.vector_ids) if i)
+        domains = ", ".join(f"{dom!r}: d{j} / B" for j, dom in enumerate(self._domain_names))
+        lines += [
+            f"    delta = ({total}) / B",
+            "    delta = max(-CLAMP, min(CLAMP, delta))",
+            "    if bmi_given:",
+            f"        iy = {{{self.vector_ids[0]!r}: l0 / B, {items}}}",
+            "    else:",
+            f"        iy = {{{items}}}",
+            f"    return R(chron + delta, delta, {{{domains}}}, iy, {self.version!r}, B, GROUPS)",
+        ]
+        exec(compile("\n".join(lines), f"<THAEngine compute: {self.version}>", "exec"), ns)
+        return ns["_compiled"]
+
+    def _bmi_lane_bin(self, answers: Dict[str, Any]) -> int:
+        """Lane 0 bin: BMI category, -1 if height/weight are unusable, _BMI_NOT_GIVEN if either is absent."""
         height_val = answers.get("height", None)
         weight_val = answers.get("weight", None)
-        if height_val is not None and weight_val is not None:
-            # Use imperial units by default (inches and pounds)
-            # Height is expected in inches (e.g., 70 for 5'10")
-            bmi = self._calculate_bmi(height_val, weight_val, "in", "lbs")
-            bmi_lnhr = self._bmi_to_lnhr(bmi)
-            per_domain_ln["body"] += bmi_lnhr
-            itemYears["bmi_calculated"] = bmi_lnhr / self.b
-
-        for it in self.items:
-            iid, dom = it["id"], it["domain"]
-            raw = answers.get(iid, None)
-
-            # Skip height/weight as they're used for BMI calculation
-            if iid in ["height", "weight"]:
-                continue
-
-            bin_idx = _raw_to_bin(it, raw) if raw is not None else None
-            lnhr = self._item_lnhr(it, bin_idx)
-            per_domain_ln[dom] += lnhr
-            itemYears[iid] = lnhr / self.b
-
-        # domain caps in log space
-        for dom, lnval in per_domain_ln.items():
-            caps = self.domains[dom]
-            per_domain_ln[dom] = max(caps["ln_cap_lo"], min(caps["ln_cap_hi"], lnval))
+        if height_val is None or weight_val is None:
+            return _BMI_NOT_GIVEN
+        bmi_bin = self._bmi_to_bin(self._calculate_bmi(height_val, weight_val, "in", "lbs"))
+        return -1 if bmi_bin is None else bmi_bin
+
+    def encode_answers(self, answers: Dict[str, Any]) -> np.ndarray:
+        """Encode raw answers as one bin index per vector lane (see vector_ids); -1 = missing."""
+        get = answers.get
+        bins = [self._bmi_lane_bin(answers)]
+        bins += [_lane_bin(it, get(iid)) for iid, it in self._vec_lanes]
+        return np.array(bins, dtype=np.intp)
+
+    def _scratch(self) -> Tuple[np.ndarray, np.ndarray]:
+        """This thread's (flat index, ln HR) lane buffers; compute_vec copies out of them before returning."""
+        try:
+            return self._tls.bufs
+        except AttributeError:
+            n = len(self.vector_ids)
+            self._tls.bufs = (np.empty(n, dtype=np.intp), np.empty(n))
+            return self._tls.bufs
+
+    def compute_vec(self, chron_age_years: float, bins: np.ndarray) -> THAResult:
+        """
+        compute() over an encoded answer vector: one gather of ln(HR) per lane, a per-domain
+        reduction and a vectorized cap. itemYears is keyed by vector_ids (BMI always present,
+        0.0 when height/weight were not given).
+        """
+        if njit is not None:
+            lnhr, per_domain_ln = _lane_domain_ln(np.asarray(bins, dtype=np.intp), self._hr_log, self._missing_ln,
+                                                  self._dom_of_item, self._dom_lo, self._dom_hi)
+        else:
+            idx, lnhr = self._scratch()
+            np.take(self._ln_table, np.add(self._lane_base, bins, out=idx), out=lnhr)
+            per_domain_ln = np.bincount(self._dom_of_item, weights=lnhr, minlength=len(self._domain_names))
+            # in-place maximum/minimum: same caps as np.clip, cheaper for a handful of domains
+            np.minimum(np.maximum(per_domain_ln, self._dom_lo, out=per_domain_ln), self._dom_hi, out=per_domain_ln)
 
-        lnHR_total = sum(per_domain_ln.values())
-        delta_years = lnHR_total / self.b
+        delta_years = float(per_domain_ln.sum()) / self.b
         delta_years = max(-self.age_clamp_years, min(self.age_clamp_years, delta_years))
 
-        domainYears = {dom: val / self.b for dom, val in per_domain_ln.items()}
-
-        return THAResult(
+        item_years = lnhr / self.b
+        result = THAResult(
             THA=chron_age_years + delta_years,
             AgeAccel=delta_years,
-            domainYears=domainYears,
-            itemYears=itemYears,
+            domainYears=dict(zip(self._domain_names, (per_domain_ln / self.b).tolist())),
+            itemYears=dict(zip(self.vector_ids, item_years.tolist())),
             algo_version=self.version,
             b=self.b,
             groups=self.groups,
         )
+        object.__setattr__(result, "_itemYears_vec", item_years)  # frozen; the kernel's array, not a rebuild
+        return result
+
+    def encode_batch(self, answers_list: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        encode_answers() for many respondents as a (rows, lanes) matrix for compute_batch, built a
+        lane at a time. Plain-number columns of non-gendered range items are binned in one
+        np.digitize over the sorted lower bounds; other lanes (and columns with gaps, NaN or
+        non-numeric values, so errors match encode_answers) resolve per answer.
+        """
+        bins = np.empty((len(answers_list), len(self.vector_ids)), dtype=np.intp)
+        bins[:, 0] = [self._bmi_lane_bin(a) for a in answers_list]
+        for lane, it in enumerate(self._vec_items, 1):
+            raws = [a.get(it["id"], None) for a in answers_list]
+            table = self._digitize_tables.get(lane)
+            if table is not None:
+                given = np.array([raw is not None for raw in raws], dtype=bool)
+                vals = [raw for raw in raws if raw is not None]
+                if all(v.__class__ is int or v.__class__ is float for v in vals):
+                    los, his, range_bins = table
+                    x = np.array(vals, dtype=float)
+                    idx = np.digitize(x, los) - 1
+                    if (idx >= 0).all() and (x <= his[idx]).all():
+                        bins[:, lane] = -1
+                        bins[given, lane] = range_bins[idx]
+                        continue
+            bins[:, lane] = [_lane_bin(it, raw) for raw in raws]
+        return bins
+
+    def compute_batch(self, chron_age_years: Union[float, np.ndarray], bins: np.ndarray) -> BatchResult:
+        """
+        Evaluate every row of a (rows, lanes) matrix of encode_answers() vectors in one pass.
+        chron_age_years is one age for all rows (e.g. what-if scenarios) or one age per row (cohorts).
+        """
+        bins = np.atleast_2d(bins)
+        if njit is not None:
+            per_domain_ln = _batch_domain_ln(np.ascontiguousarray(bins, dtype=np.intp), self._hr_log,
+                                             self._missing_ln, self._dom_of_item, self._dom_lo, self._dom_hi)
+        else:
+            lnhr = np.where(bins >= 0, self._hr_log[self._lanes, bins], self._missing_ln)
+            per_domain_ln = np.clip(lnhr @ self._dom_onehot, self._dom_lo, self._dom_hi)
+        delta_years = np.clip(per_domain_ln.sum(axis=1) / self.b, -self.age_clamp_years, self.age_clamp_years)
+        return BatchResult(
+            THA=np.asarray(chron_age_years, dtype=float) + delta_years,
+            AgeAccel=delta_years,
+            domainYears=per_domain_ln / self.b,
+            domain_names=self._domain_names,
+            algo_version=self.version,
+            b=self.b,
+        )
 
-    def what_if(self, chron_age_years: float, answers: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    def what_if(self, chron_age_years: float, answers: Dict[str, Any], changes: Dict[str, Any],
+                *, base: Optional[THAResult] = None) -> Dict[str, Any]:
+        """
+        Effect of applying changes to answers. When trying many changes against the same answers,
+        pass base=compute(chron_age_years, answers) so the baseline is not recomputed each call.
+        """
         proposed = dict(answers)
         proposed.update(changes)  # values can be raw options, numbers, or bin indices
-        base = self.compute(chron_age_years, answers)
+        if base is None:
+            base = self.compute(chron_age_years, answers)
         new = self.compute(chron_age_years, proposed)
         return {"delta_years": new.AgeAccel - base.AgeAccel, "new_THA": new.THA, "old_THA": base.THA}
 
     def one_step_gains_months(self, answers: Dict[str, Any]) -> Dict[str, float]:
         gains: Dict[str, float] = {}
-        for it in self.items:
-            iid = it["id"]
-            raw = answers.get(iid, None)
+        get, item_bin = answers.get, self._item_bin
+        for iid, gain_months in self._gain_rows:
+            raw = get(iid)
             if raw is None:
                 gains[iid] = 0.0
                 continue
             # map raw to bin; if already best, no gain
             try:
-                curr = _raw_to_bin(it, raw)
+                curr = item_bin(iid, raw)
             except Exception:
                 gains[iid] = 0.0
                 continue
-            max_bin = len(it["hr"]) - 1
-            if curr is None or curr >= max_bin:
-                gains[iid] = 0.0
-                continue
-            hr_now, hr_next = it["hr"][curr], it["hr"][curr + 1]
-            gain_years = (math.log(hr_now) - math.log(hr_next)) / self.b
-            gains[iid] = gain_years * 12.0
+            gains[iid] = 0.0 if curr is None else gain_months[curr]
         return gains
 
+# libyaml's C loader when PyYAML was built with it (same results as safe_load, much faster)
+_YAML_LOADER = (getattr(yaml, "CSafeLoader", None) or yaml.SafeLoader) if yaml else None
+
+def config_cache_path(path: str | Path) -> Path:
+    """JSON sidecar holding the parsed YAML config (see load_config)."""
+    return Path(str(path) + ".cache.json")
+
 def load_config(path: str | Path) -> Dict[str, Any]:
-    text = Path(path).read_text(encoding="utf-8")
-    if yaml and str(path).endswith((".yaml", ".yml")):
-        return yaml.safe_load(text)
-    return json.loads(text)
+    """
+    Parse a YAML (or JSON) config. YAML parses are cached in a JSON sidecar next to the file and
+    reused while it is at least as new as the YAML; the sidecar is rewritten after each parse, and
+    only when JSON gives back exactly the parsed config.
+    """
+    path = Path(path)
+    if not (yaml and path.suffix in (".yaml", ".yml")):
+        return _json_loads(path.read_bytes())
+    cache = config_cache_path(path)
+    try:
+        if cache.stat().st_mtime >= path.stat().st_mtime:
+            return _json_loads(cache.read_bytes())
+    except (OSError, ValueError):
+        pass
+    cfg = yaml.load(path.read_bytes(), Loader=_YAML_LOADER)
+    try:
+        # strict JSON (orjson rejects NaN/Infinity); write-then-rename so a concurrent
+        # reader never sees a partial file
+        data = json.dumps(cfg, allow_nan=False)
+        if _json_loads(data.encode("utf-8")) != cfg:
+            # lossy round trip (e.g. int mapping keys would come back as strings): never cache it
+            cache.unlink(missing_ok=True)
+            return cfg
+        tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, cache)
+    except (OSError, ValueError, TypeError):
+        pass  # read-only checkout, non-finite floats or dates: keep working without the cache
+    return cfg
+
+def engine_state_path(config_path: str | Path) -> Path:
+    """Where scripts/precompile_engine.py writes the pickled engine for a config."""
+    return Path(str(config_path) + ".engine.pkl")
+
+def load_engine(config_path: str | Path) -> THAEngine:
+    """
+    Build the engine for a config, preferring the precompiled pickle when it is at least as new
+    as the config (skips YAML parsing). Falls back to the config on a stale/missing/unreadable pickle.
+    Only load pickles you produced yourself.
+    """
+    state_path = engine_state_path(config_path)
+    try:
+        if state_path.stat().st_mtime >= Path(config_path).stat().st_mtime:
+            return THAEngine.from_state(pickle.loads(state_path.read_bytes()))
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+    return THAEngine(load_config(config_path))
 
 # Optional CLI for quick smoke test
 if __name__ == "__main__":